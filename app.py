@@ -1,13 +1,15 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, time as dt_time
 import folium
 from streamlit_folium import st_folium
 import json
 import requests
-from streamlit_lottie import st_lottie
 import time
 import random
+import uuid
+from types import MappingProxyType
+from contextlib import nullcontext
 
 # Import backend
 from data_fetching import predict_weather
@@ -23,29 +25,24 @@ st.set_page_config(
 )
 
 # Initialize session state
-if 'persona' not in st.session_state:
-    st.session_state.persona = 'balanced'
-if 'location' not in st.session_state:
-    st.session_state.location = None
-if 'predictions' not in st.session_state:
-    st.session_state.predictions = None
-if 'raw_backend_data' not in st.session_state:
-    st.session_state.raw_backend_data = None
-if 'years_back' not in st.session_state:
-    st.session_state.years_back = 15
-if 'n_ensemble' not in st.session_state:
-    st.session_state.n_ensemble = 1000
-if 'easter_egg_found' not in st.session_state:
-    st.session_state.easter_egg_found = False
-if 'character_clicks' not in st.session_state:
-    st.session_state.character_clicks = 0
-if 'card_generated' not in st.session_state:
-    st.session_state.card_generated = False
-if 'card_image' not in st.session_state:
-    st.session_state.card_image = None
-
-# Persona configurations
-PERSONAS = {
+_DEFAULTS = {
+    'persona': 'balanced',
+    'location': None,
+    'predictions': None,
+    'raw_backend_data': None,
+    'prediction_id': None,
+    'years_back': 15,
+    'n_ensemble': 1000,
+    'easter_egg_found': False,
+    'character_clicks': 0,
+    'card_generated': False,
+    'card_image': None,
+}
+for _key, _value in _DEFAULTS.items():
+    st.session_state.setdefault(_key, _value)
+
+# Persona configurations (read-only)
+PERSONAS = MappingProxyType({
     'sun_lover': {
         'icon': '☀️',
         'name': 'Sun Lover',
@@ -74,10 +71,15 @@ PERSONAS = {
         'character': '🦋',
         'greeting': 'Every weather is beautiful!'
     }
-}
+})
+
+# Precomputed "icon name" labels for the sidebar
+PERSONA_LABELS = MappingProxyType({
+    key: f"{persona['icon']} {persona['name']}" for key, persona in PERSONAS.items()
+})
 
-# Dynamic character states based on weather
-WEATHER_CHARACTERS = {
+# Dynamic character states based on weather (read-only)
+WEATHER_CHARACTERS = MappingProxyType({
     'sunny': {'char': '🦋', 'state': 'flying joyfully'},
     'clear': {'char': '🦋', 'state': 'basking in sunshine'},
     'partly_cloudy': {'char': '🐝', 'state': 'buzzing around'},
@@ -91,12 +93,28 @@ WEATHER_CHARACTERS = {
     'windy': {'char': '🍃', 'state': 'being blown around'},
     'hot': {'char': '🦎', 'state': 'sunbathing'},
     'cold': {'char': '🐻', 'state': 'hibernating mode'}
+})
+_CHAR_ITEMS = tuple(WEATHER_CHARACTERS.items())
+_DEFAULT_CHAR = WEATHER_CHARACTERS['clear']
+
+# Weather classification to emoji icon
+_ICON_MAP = {
+    'sunny': '☀️', 'clear': '☀️', 'partly_cloudy': '⛅',
+    'cloudy': '☁️', 'overcast': '☁️', 'rainy': '🌧️',
+    'light_rain': '🌦️', 'heavy_rain': '🌧️', 'stormy': '⛈️',
+    'thunderstorm': '⛈️', 'snowy': '❄️', 'light_snow': '🌨️',
+    'heavy_snow': '❄️', 'foggy': '🌫️', 'windy': '💨',
+    'hot': '🔥', 'cold': '🥶'
 }
 
-# Custom CSS based on persona
-def get_custom_css(persona):
-    theme = PERSONAS[persona]['theme']
-    return f"""
+# Easter egg hint; the actual trigger is the ✨ button in the sidebar
+_EASTER_HTML = (
+    '<div id="easter_hint" class="easter-egg-hint" '
+    'title="Try clicking me 5 times!">✨</div>'
+)
+
+# Custom CSS based on persona (str.format template: literal braces are doubled)
+_CSS_TEMPLATE = """
     <style>
     @import url('https://fonts.googleapis.com/css2?family=Outfit:wght@300;400;600;700&display=swap');
     
@@ -105,7 +123,7 @@ def get_custom_css(persona):
     }}
     
     .stApp {{
-        background: linear-gradient(135deg, {theme['secondary']} 0%, #ffffff 100%);
+        background: linear-gradient(135deg, {secondary} 0%, #ffffff 100%);
     }}
 
     header {{visibility: visible}}
@@ -114,9 +132,9 @@ def get_custom_css(persona):
 
     /* Header background & text */
     header {{
-        background: {theme['secondary']} !important;
+        background: {secondary} !important;
         color: #333 !important;
-        border-bottom: 1px solid {theme['primary']}40 !important;
+        border-bottom: 1px solid {primary}40 !important;
     }}
 
     /* Sidebar content top-aligned and scrollable */
@@ -137,7 +155,7 @@ def get_custom_css(persona):
     .main-title {{
         font-size: 3.5rem;
         font-weight: 700;
-        background: linear-gradient(135deg, {theme['primary']} 0%, {theme['accent']} 100%);
+        background: linear-gradient(135deg, {primary} 0%, {accent} 100%);
         -webkit-background-clip: text;
         -webkit-text-fill-color: transparent;
         margin-bottom: 0.5rem;
@@ -159,19 +177,19 @@ def get_custom_css(persona):
     }}
     
     .weather-display {{
-        background: linear-gradient(135deg, {theme['primary']}20 0%, white 100%);
+        background: linear-gradient(135deg, {primary}20 0%, white 100%);
         border-radius: 24px;
         padding: 2.5rem;
         margin: 2rem 0;
         box-shadow: 0 12px 32px rgba(0,0,0,0.1);
-        border: 1px solid {theme['primary']}40;
+        border: 1px solid {primary}40;
         animation: fadeIn 0.8s ease-in;
     }}
     
     .temp-display {{
         font-size: 5rem;
         font-weight: 700;
-        color: {theme['accent']};
+        color: {accent};
     }}
     
     .weather-icon {{
@@ -213,7 +231,7 @@ def get_custom_css(persona):
     .param-value {{
         font-size: 2rem;
         font-weight: 600;
-        color: {theme['accent']};
+        color: {accent};
     }}
     
     .param-label {{
@@ -262,7 +280,7 @@ def get_custom_css(persona):
     }}
     
     .stButton > button {{
-        background: linear-gradient(135deg, {theme['primary']} 0%, {theme['accent']} 100%) !important;
+        background: linear-gradient(135deg, {primary} 0%, {accent} 100%) !important;
         color: white !important;
         border: none !important;
         padding: 0.8rem 2.5rem !important;
@@ -270,16 +288,16 @@ def get_custom_css(persona):
         font-weight: 600 !important;
         font-size: 1.1rem !important;
         transition: all 0.3s ease !important;
-        box-shadow: 0 4px 12px {theme['primary']}40 !important;
+        box-shadow: 0 4px 12px {primary}40 !important;
     }}
     
     .stButton > button:hover {{
         transform: translateY(-2px) !important;
-        box-shadow: 0 6px 20px {theme['primary']}60 !important;
+        box-shadow: 0 6px 20px {primary}60 !important;
     }}
     
     .stDownloadButton > button {{
-        background: linear-gradient(135deg, {theme['primary']} 0%, {theme['accent']} 100%) !important;
+        background: linear-gradient(135deg, {primary} 0%, {accent} 100%) !important;
         color: white !important;
         border: none !important;
         padding: 0.8rem 2.5rem !important;
@@ -287,12 +305,12 @@ def get_custom_css(persona):
         font-weight: 600 !important;
         font-size: 1.1rem !important;
         transition: all 0.3s ease !important;
-        box-shadow: 0 4px 12px {theme['primary']}40 !important;
+        box-shadow: 0 4px 12px {primary}40 !important;
     }}
     
     .stDownloadButton > button:hover {{
         transform: translateY(-2px) !important;
-        box-shadow: 0 6px 20px {theme['primary']}60 !important;
+        box-shadow: 0 6px 20px {primary}60 !important;
     }}
     
     .stMarkdown, .stText, p, span, div {{
@@ -319,7 +337,7 @@ def get_custom_css(persona):
     }}
     
     .stTabs [aria-selected="true"] {{
-        background-color: {theme['primary']} !important;
+        background-color: {primary} !important;
         color: white !important;
     }}
     
@@ -362,7 +380,7 @@ def get_custom_css(persona):
     
     /* Sidebar styling */
     [data-testid="stSidebar"] {{
-        background: linear-gradient(180deg, {theme['secondary']} 0%, #ffffff 100%);
+        background: linear-gradient(180deg, {secondary} 0%, #ffffff 100%);
     }}
     
     [data-testid="stSidebar"] .stButton > button {{
@@ -406,25 +424,31 @@ def get_custom_css(persona):
     </style>
     """
 
+@st.cache_data(max_entries=8)
+def get_custom_css(persona):
+    theme = PERSONAS[persona]['theme']
+    return _CSS_TEMPLATE.format(**theme)
+
 # Helper functions
 def get_weather_icon(classification):
     """Map weather classification to emoji icon"""
-    icon_map = {
-        'sunny': '☀️', 'clear': '☀️', 'partly_cloudy': '⛅',
-        'cloudy': '☁️', 'overcast': '☁️', 'rainy': '🌧️',
-        'light_rain': '🌦️', 'heavy_rain': '🌧️', 'stormy': '⛈️',
-        'thunderstorm': '⛈️', 'snowy': '❄️', 'light_snow': '🌨️',
-        'heavy_snow': '❄️', 'foggy': '🌫️', 'windy': '💨',
-        'hot': '🔥', 'cold': '🥶'
-    }
-    return icon_map.get(classification.lower(), '🌤️')
+    return _ICON_MAP.get(classification.lower(), '🌤️')
 
 def get_dynamic_character(condition):
     """Get weather-appropriate character"""
-    for key in WEATHER_CHARACTERS:
-        if key in condition.lower():
-            return WEATHER_CHARACTERS[key]
-    return WEATHER_CHARACTERS.get('clear', {'char': '🦋', 'state': 'floating peacefully'})
+    c = condition.lower()
+    hit = WEATHER_CHARACTERS.get(c)
+    if hit:
+        return hit
+    # Compound classifications (e.g. 'windy_rainy') fall back to substring matching
+    for key, val in _CHAR_ITEMS:
+        if key in c:
+            return val
+    return _DEFAULT_CHAR
+
+def uv_from_solar_radiation(srad):
+    """Rough UV index (0-11) from mean surface solar radiation in W/m²"""
+    return min(11, max(0, int(srad / 80)))
 
 def transform_backend_data(backend_results, target_date, target_time, location):
     """Transform backend prediction results to frontend format"""
@@ -449,7 +473,7 @@ def transform_backend_data(backend_results, target_date, target_time, location):
         'solar_radiation': pred['solar_radiation']['mean'],
         'dew_point': pred['dew_point']['mean'],
         'visibility': 10,
-        'uv_index': min(11, max(0, int(pred['solar_radiation']['mean'] / 80))),
+        'uv_index': uv_from_solar_radiation(pred['solar_radiation']['mean']),
         'condition': weather_class,
         'condition_text': weather_class.replace('_', ' ').title(),
         'description': weather_desc_full,
@@ -462,17 +486,113 @@ def transform_backend_data(backend_results, target_date, target_time, location):
     return transformed
 
 def format_time_12hr(time_24):
-    """Convert 24hr time input to 12hr format with AM/PM"""
-    return time_24.strftime('%I:%M %p')
+    """Convert 24hr time input to 12hr format with AM/PM (locale-independent)"""
+    hour_12 = (time_24.hour - 1) % 12 + 1
+    return f"{hour_12:02d}:{time_24.minute:02d} {'AM' if time_24.hour < 12 else 'PM'}"
+
+
+@st.cache_data(ttl=3600, max_entries=256, show_spinner=False)
+def _cached_predict(lat, lon, target_iso, years_back, N_mc):
+    """Run the backend prediction, memoized on its (hashable) inputs"""
+    return predict_weather(
+        lat=lat,
+        lon=lon,
+        target_date=datetime.fromisoformat(target_iso),
+        years_back=years_back,
+        N_mc=N_mc
+    )
+
 
+LOTTIE_SPINNER_URL = "https://assets7.lottiefiles.com/packages/lf20_usmfx6bp.json"
 
+
+@st.cache_data(ttl=86400, show_spinner=False)
 def load_lottieurl(url):
-    r = requests.get(url)
-    if r.status_code != 200:
+    try:
+        r = requests.get(url, timeout=5)
+        if r.status_code != 200:
+            return None
+        return r.json()
+    except requests.RequestException:
+        # Unreachable host or a non-JSON body (e.g. a maintenance page)
         return None
-    return r.json()
 
-lottie_spinner = load_lottieurl("https://assets7.lottiefiles.com/packages/lf20_usmfx6bp.json")  # spinner
+
+# Download payloads, built once per prediction (underscored args are not hashed)
+@st.cache_data(max_entries=32, show_spinner=False)
+def _csv_payload(pred_key, _pred):
+    return pd.DataFrame([_pred]).to_csv(index=False)
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _json_payload(pred_key, _pred):
+    return json.dumps(_pred, default=str, indent=2)
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _raw_json_payload(pred_key, _raw):
+    return json.dumps(_raw, default=str, separators=(',', ':'))
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _render_prediction(pred_key, _pred):
+    """
+    Pre-format the static parts of the prediction display
+    
+    Returns:
+        tuple: (main_html, details_md, params_html)
+    """
+    icon = get_weather_icon(_pred['condition'])
+    main_html = f"""
+    <div style="text-align: center;">
+        <div class="weather-icon">{icon}</div>
+        <div class="temp-display">{_pred['temperature']:.1f}°C</div>
+        <div style="font-size: 1.2rem; color: #888;">Feels like {_pred['feels_like']:.1f}°C</div>
+        <div style="font-size: 0.9rem; color: #aaa; margin-top: 0.5rem;">
+            Range: {_pred['temp_min']:.1f}°C - {_pred['temp_max']:.1f}°C
+        </div>
+    </div>
+    """
+    
+    # Heading, date/location and the personalized description
+    details_md = "\n\n".join([
+        f"### {_pred['condition_text']}",
+        f"**📅 {_pred['date'].strftime('%A, %B %d, %Y')}** at **🕐 {format_time_12hr(_pred['time'])}**",
+        f"**📍 Location:** {_pred['location']['lat']:.4f}°N, {_pred['location']['lon']:.4f}°E",
+        f'<div class="weather-description">{_pred["description"]}</div>',
+    ])
+    
+    params = [
+        {'icon': '💧', 'label': 'Humidity', 'value': f"{_pred['humidity']:.1f}%"},
+        {'icon': '💨', 'label': 'Wind Speed', 'value': f"{_pred['wind_speed']:.1f} m/s"},
+        {'icon': '🌧️', 'label': 'Precipitation', 'value': f"{_pred['precipitation']:.1f} mm"},
+        {'icon': '☔', 'label': 'Rain Probability', 'value': f"{_pred['precipitation_prob']:.0f}%"},
+        {'icon': '☁️', 'label': 'Cloud Cover', 'value': f"{_pred['cloud_cover']:.1f}%"},
+        {'icon': '☀️', 'label': 'Solar Radiation', 'value': f"{_pred['solar_radiation']:.0f} W/m²"},
+    ]
+    cards_html = "".join(
+        f'<div class="param-card"><div class="param-icon">{p["icon"]}</div>'
+        f'<div class="param-value">{p["value"]}</div>'
+        f'<div class="param-label">{p["label"]}</div></div>'
+        for p in params
+    )
+    params_html = f'<div class="weather-params">{cards_html}</div>'
+    
+    return main_html, details_md, params_html
+
+
+@st.cache_resource
+def _card_generator():
+    return WeatherCardGenerator()
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _card_webp(pred_key, persona, _pred):
+    """Render the weather card for a prediction and return it as WebP bytes"""
+    generator = _card_generator()
+    card_image = generator.generate_card(
+        weather_data=_pred,
+        persona=persona,
+        include_quote=True
+    )
+    return generator.card_to_bytes(card_image)
 
 
 def show_timed_toast(message, theme_color="#388E3C", duration=3):
@@ -499,19 +619,7 @@ def show_timed_toast(message, theme_color="#388E3C", duration=3):
 
 
 # Easter egg hint (subtle)
-st.markdown("""
-<div id="easter_hint" class="easter-egg-hint" title="Try clicking me 5 times!">✨</div>
-<script>
-const hint = document.getElementById("easter_hint");
-let count = 0;
-hint.addEventListener("click", () => {
-    count++;
-    if (count >= 5) {
-        window.parent.postMessage({isEasterEgg:true}, "*");
-    }
-});
-</script>
-""", unsafe_allow_html=True)
+st.markdown(_EASTER_HTML, unsafe_allow_html=True)
 
 
 # if st.button("✨"):
@@ -521,16 +629,22 @@ hint.addEventListener("click", () => {
 
 
 
-# Floating character with weather awareness
-if st.session_state.predictions:
-    weather_char = get_dynamic_character(st.session_state.predictions['condition'])
-    character = weather_char['char']
-    char_state = weather_char['state']
-else:
-    character = PERSONAS[st.session_state.persona]['character']
-    char_state = PERSONAS[st.session_state.persona]['greeting']
+# Floating character with weather awareness (rebuilt only when prediction or persona changes)
+char_sig = (st.session_state.prediction_id if st.session_state.predictions else None,
+            st.session_state.persona)
+if st.session_state.get('_char_sig') != char_sig:
+    if st.session_state.predictions:
+        weather_char = get_dynamic_character(st.session_state.predictions['condition'])
+        character = weather_char['char']
+        char_state = weather_char['state']
+    else:
+        active_persona = PERSONAS[st.session_state.persona]
+        character = active_persona['character']
+        char_state = active_persona['greeting']
+    st.session_state._char_html = f'<div class="floating-character" title="{char_state}">{character}</div>'
+    st.session_state._char_sig = char_sig
 
-st.markdown(f'<div class="floating-character" title="{char_state}">{character}</div>', unsafe_allow_html=True)
+st.markdown(st.session_state._char_html, unsafe_allow_html=True)
 
 # Header
 st.markdown(f"""
@@ -546,20 +660,17 @@ with st.sidebar:
     st.markdown("### Choose Your Weather Persona")
     st.markdown("---")
     
-    for key, persona in PERSONAS.items():
-        is_active = st.session_state.persona == key
-        button_type = "primary" if is_active else "secondary"
-        
-        if st.button(
-            f"{persona['icon']} {persona['name']}", 
-            key=f"persona_{key}",
-            use_container_width=True
-        ):
-            st.session_state.persona = key
-            st.rerun()
+    # Bound to st.session_state.persona, so the new value is already set when the script reruns
+    st.radio(
+        "Persona",
+        options=list(PERSONAS),
+        format_func=PERSONA_LABELS.__getitem__,
+        key="persona",
+        label_visibility="collapsed"
+    )
     
     st.markdown("---")
-    st.success(f"**Active:** {PERSONAS[st.session_state.persona]['icon']} {PERSONAS[st.session_state.persona]['name']}")
+    st.success(f"**Active:** {PERSONA_LABELS[st.session_state.persona]}")
     
     st.markdown("---")
     st.markdown("### ⚙️ Advanced Settings")
@@ -600,7 +711,8 @@ location_tab1, location_tab2 = st.tabs(["🗺️ Map Selection", "📌 Coordinat
 with location_tab1:
     st.markdown("**Click on the map to select a location**")
     
-    # Create folium map
+    # Create folium map (fresh each run: st_folium re-renders and rewrites
+    # element ids on the object it is given, so it must not be shared)
     m = folium.Map(
         location=[20.5937, 78.9629],
         zoom_start=5,
@@ -659,7 +771,7 @@ with col2:
     else:
         hour_24 = hour_12
     
-    target_time = datetime.strptime(f"{hour_24}:00", "%H:%M").time()
+    target_time = dt_time(hour_24, 0)
     st.caption(f"Selected: {format_time_12hr(target_time)}")
 
 st.markdown('</div>', unsafe_allow_html=True)
@@ -669,21 +781,33 @@ if st.session_state.location:
     if st.button("🔮 Predict Weather", use_container_width=True):
         with st.empty():
             try:
-                st_lottie(lottie_spinner, height=150, key="loading_spinner")
+                # Built-in spinner by default; only heavy ensembles get the Lottie animation
+                lottie_spinner = None
+                if st.session_state.n_ensemble > 1000:
+                    lottie_spinner = load_lottieurl(LOTTIE_SPINNER_URL)
+                if lottie_spinner:
+                    from streamlit_lottie import st_lottie
+                    st_lottie(lottie_spinner, height=150, key="loading_spinner")
+                    spinner = nullcontext()
+                else:
+                    spinner = st.spinner("Running ensemble forecast…")
+                
                 # Create datetime object
                 target_datetime = datetime.combine(target_date, target_time)
                 
-                # Call the backend
-                backend_results = predict_weather(
-                    lat=st.session_state.location['lat'],
-                    lon=st.session_state.location['lon'],
-                    target_date=target_datetime,
-                    years_back=st.session_state.years_back,
-                    N_mc=st.session_state.n_ensemble
-                )
+                # Call the backend (coordinates rounded so nearby clicks share a cache entry)
+                with spinner:
+                    backend_results = _cached_predict(
+                        round(st.session_state.location['lat'], 4),
+                        round(st.session_state.location['lon'], 4),
+                        target_datetime.isoformat(),
+                        st.session_state.years_back,
+                        st.session_state.n_ensemble
+                    )
                 
                 # Store raw backend data
                 st.session_state.raw_backend_data = backend_results
+                st.session_state.prediction_id = uuid.uuid4().hex
                 
                 # Transform to frontend format
                 st.session_state.predictions = transform_backend_data(
@@ -717,52 +841,16 @@ if st.session_state.predictions:
     # Main weather display
     col1, col2 = st.columns([1, 2])
     
+    main_html, details_md, params_html = _render_prediction(st.session_state.prediction_id, pred)
+    
     with col1:
-        icon = get_weather_icon(pred['condition'])
-        
-        st.markdown(f"""
-        <div style="text-align: center;">
-            <div class="weather-icon">{icon}</div>
-            <div class="temp-display">{pred['temperature']:.1f}°C</div>
-            <div style="font-size: 1.2rem; color: #888;">Feels like {pred['feels_like']:.1f}°C</div>
-            <div style="font-size: 0.9rem; color: #aaa; margin-top: 0.5rem;">
-                Range: {pred['temp_min']:.1f}°C - {pred['temp_max']:.1f}°C
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(main_html, unsafe_allow_html=True)
     
     with col2:
-        st.markdown(f"### {pred['condition_text']}")
-        st.markdown(f"**📅 {pred['date'].strftime('%A, %B %d, %Y')}** at **🕐 {format_time_12hr(pred['time'])}**")
-        st.markdown(f"**📍 Location:** {pred['location']['lat']:.4f}°N, {pred['location']['lon']:.4f}°E")
-        
-        # Personalized description
-        st.markdown(f'<div class="weather-description">{pred["description"]}</div>', unsafe_allow_html=True)
-    
-    # Weather parameters grid
-    st.markdown('<div class="weather-params">', unsafe_allow_html=True)
+        st.markdown(details_md, unsafe_allow_html=True)
     
-    params = [
-        {'icon': '💧', 'label': 'Humidity', 'value': f"{pred['humidity']:.1f}%"},
-        {'icon': '💨', 'label': 'Wind Speed', 'value': f"{pred['wind_speed']:.1f} m/s"},
-        {'icon': '🌧️', 'label': 'Precipitation', 'value': f"{pred['precipitation']:.1f} mm"},
-        {'icon': '☔', 'label': 'Rain Probability', 'value': f"{pred['precipitation_prob']:.0f}%"},
-        {'icon': '☁️', 'label': 'Cloud Cover', 'value': f"{pred['cloud_cover']:.1f}%"},
-        {'icon': '☀️', 'label': 'Solar Radiation', 'value': f"{pred['solar_radiation']:.0f} W/m²"},
-    ]
-    
-    cols = st.columns(3)
-    for idx, param in enumerate(params):
-        with cols[idx % 3]:
-            st.markdown(f"""
-            <div class="param-card">
-                <div class="param-icon">{param['icon']}</div>
-                <div class="param-value">{param['value']}</div>
-                <div class="param-label">{param['label']}</div>
-            </div>
-            """, unsafe_allow_html=True)
-    
-    st.markdown('</div>', unsafe_allow_html=True)
+    # Weather parameters grid (laid out by the .weather-params CSS grid)
+    st.markdown(params_html, unsafe_allow_html=True)
     st.markdown('</div>', unsafe_allow_html=True)
     
     # Show detailed statistics in expander
@@ -791,8 +879,7 @@ if st.session_state.predictions:
     
     with col1:
         # CSV download
-        df = pd.DataFrame([pred])
-        csv = df.to_csv(index=False)
+        csv = _csv_payload(st.session_state.prediction_id, pred)
         st.download_button(
             label="📊 Download CSV",
             data=csv,
@@ -803,7 +890,7 @@ if st.session_state.predictions:
     
     with col2:
         # JSON download
-        json_str = json.dumps(pred, default=str, indent=2)
+        json_str = _json_payload(st.session_state.prediction_id, pred)
         st.download_button(
             label="📄 Download JSON",
             data=json_str,
@@ -815,7 +902,7 @@ if st.session_state.predictions:
     with col3:
         # Raw backend data download
         if st.session_state.raw_backend_data:
-            raw_json = json.dumps(st.session_state.raw_backend_data, default=str, indent=2)
+            raw_json = _raw_json_payload(st.session_state.prediction_id, st.session_state.raw_backend_data)
             st.download_button(
                 label="🔬 Download Raw Data",
                 data=raw_json,
@@ -829,28 +916,24 @@ if st.session_state.predictions:
         if st.button("🎨 Generate Weather Card", use_container_width=True):
             with st.spinner("Creating your beautiful weather card..."):
                 try:
-                    # Generate the card
-                    generator = WeatherCardGenerator()
-                    card_image = generator.generate_card(
-                        weather_data=pred,
-                        persona=st.session_state.persona,
-                        include_quote=True
+                    # Generate the card (memoized per prediction and persona)
+                    card_bytes = _card_webp(
+                        st.session_state.prediction_id,
+                        st.session_state.persona,
+                        pred
                     )
                     
-                    # Convert to bytes
-                    card_bytes = generator.card_to_bytes(card_image)
-                    
                     # Create download button
                     st.download_button(
                         label="💾 Download Card",
                         data=card_bytes,
-                        file_name=f"weather_card_{target_date}.png",
-                        mime="image/png",
+                        file_name=f"weather_card_{target_date}.webp",
+                        mime="image/webp",
                         use_container_width=True
                     )
                     
                     # Show preview
-                    st.image(card_image, caption="Your Weather Card Preview", use_container_width=True)
+                    st.image(card_bytes, caption="Your Weather Card Preview", use_container_width=True)
                     st.success("✅ Weather card generated!")
                     
                 except Exception as e:
@@ -1,20 +1,59 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import xarray as xr
+import netCDF4
 import numpy as np
-from io import BytesIO
+import scipy.linalg
 from datetime import datetime, timedelta
 from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import hashlib
+import json
+import os
+import threading
 import warnings
-warnings.filterwarnings('ignore')
+
+# libhdf5 is not thread-safe: fetches download concurrently but parse one at a time
+_NETCDF_LOCK = threading.Lock()
+
+# Ranges ending more recently than this may still be revised upstream, so
+# they are always fetched fresh rather than served from the response cache
+_CACHE_MIN_AGE = timedelta(days=30)
 
 
 class WeatherPredictor:
     """Main class for weather prediction using NASA POWER data and PCA"""
     
-    def __init__(self):
+    def __init__(self, cache_dir=".power_cache", cache_max_bytes=256 * 1024 ** 2):
         self.parameters = ["PRECTOTCORR", "T2M", "RH2M", "CLOUD_AMT", 
                           "WS10M", "ALLSKY_SFC_SW_DWN", "T2MDEW"]
         self.base_url = "https://power.larc.nasa.gov/api/temporal/hourly/point"
+        # One keep-alive pool shared by the per-year fetch threads, so each
+        # year reuses a connection instead of a new TCP+TLS handshake
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=16, pool_maxsize=16,
+            max_retries=Retry(total=3, backoff_factor=0.3,
+                              status_forcelist=(429, 500, 502, 503, 504)))
+        self.session.mount("https://", adapter)
+        # Raw POWER responses on disk, one file per request; None disables.
+        # Least recently used files are evicted once the directory would
+        # exceed cache_max_bytes
+        self.cache_dir = cache_dir
+        self.cache_max_bytes = cache_max_bytes
+        self.rng = np.random.default_rng()
+        # Physical bounds per parameter, in self.parameters order
+        self._lo = np.array([
+            0.0,       # PRECTOTCORR
+            -80.0,     # T2M
+            0.0,       # RH2M
+            0.0,       # CLOUD_AMT
+            0.0,       # WS10M
+            0.0,       # ALLSKY_SFC_SW_DWN
+            -80.0      # T2MDEW
+        ])
+        self._hi = np.array([np.inf, 60.0, 100.0, 100.0, np.inf, np.inf, 60.0])
         
     def fetch_power_point(self, lat, lon, start, end):
         """Fetch POWER hourly data for a given lat/lon and time range"""
@@ -28,15 +67,100 @@ class WeatherPredictor:
             "format": "NetCDF"
         }
         
+        cache_path = self._cache_path(params)
+        if cache_path is not None and os.path.exists(cache_path):
+            ds = self._cache_load(cache_path)
+            if ds is not None:
+                return ds
+        
         try:
-            resp = requests.get(self.base_url, params=params, timeout=30)
+            resp = self.session.get(self.base_url, params=params, timeout=30)
             resp.raise_for_status()
-            ds = xr.open_dataset(BytesIO(resp.content))
+            # Parse before caching so a bad payload is never stored
+            ds = self._parse_power_netcdf(resp.content)
+            if cache_path is not None:
+                self._cache_store(cache_path, resp.content)
             return ds
         except Exception as e:
             print(f"⚠️ Error fetching data: {e}")
             return None
 
+    def _cache_path(self, params):
+        """Cache file for a request, or None if it should not be cached"""
+        if self.cache_dir is None:
+            return None
+        if datetime.now() - datetime.strptime(params["end"], "%Y%m%d") < _CACHE_MIN_AGE:
+            return None
+        key = json.dumps(params, sort_keys=True).encode()
+        return os.path.join(self.cache_dir, hashlib.sha256(key).hexdigest() + ".nc")
+
+    def _cache_load(self, cache_path):
+        """Parse a cached response; an unreadable file is deleted and None returned"""
+        try:
+            with open(cache_path, 'rb') as f:
+                ds = self._parse_power_netcdf(f.read())
+            # Mark as recently used for eviction
+            os.utime(cache_path)
+            return ds
+        except Exception as e:
+            print(f"⚠️ Discarding unreadable cached POWER response: {e}")
+            try:
+                os.remove(cache_path)
+            except OSError:
+                pass
+            return None
+
+    def _cache_store(self, cache_path, content):
+        """Write a response to the cache atomically; failures are not fatal"""
+        tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, cache_path)
+            self._cache_prune()
+        except OSError as e:
+            print(f"⚠️ Could not cache POWER response: {e}")
+
+    def _cache_prune(self):
+        """Delete the least recently used cache files until under cache_max_bytes"""
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".nc"):
+                    try:
+                        st = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+        
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.cache_max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def _parse_power_netcdf(self, content):
+        """Read just time and self.parameters from an in-memory POWER NetCDF"""
+        with _NETCDF_LOCK, netCDF4.Dataset('power.nc', memory=content) as nc:
+            time_var = nc.variables['time']
+            times = netCDF4.num2date(
+                time_var[:], time_var.units, getattr(time_var, 'calendar', 'standard'),
+                only_use_cftime_datetimes=False, only_use_python_datetimes=True)
+            n_times = len(times)
+            # Point requests: lat/lon are length 1, so each variable is a series;
+            # masked fill values become NaN as xarray's CF decoding did
+            data = {
+                p: ('time', np.ma.filled(
+                    nc.variables[p][:].astype(np.float64), np.nan).reshape(n_times))
+                for p in self.parameters
+            }
+        return xr.Dataset(data, coords={'time': np.array(times, dtype='datetime64[ns]')})
+
     def fetch_multi_year_data(self, lat, lon, month, day, end_year, 
                              years_back, days_window=2, max_workers=8):
         """Fetch multi-year historical data around target date"""
@@ -64,7 +188,8 @@ class WeatherPredictor:
                     all_years_ds.append(ds)
         
         if all_years_ds:
-            combined = xr.concat(all_years_ds, dim="year")
+            # Each year has its own dates; outer-join them onto one time axis
+            combined = xr.concat(all_years_ds, dim="year", join="outer")
         else:
             combined = None
         
@@ -73,75 +198,67 @@ class WeatherPredictor:
     def prepare_daily_data(self, combined_ds, days_window):
         """Aggregate hourly data to daily averages"""
         combined_ds = combined_ds.squeeze(drop=True)
-        combined_ds = combined_ds.assign_coords(
-            dayofyear=("time", combined_ds.time.dt.dayofyear.data),
-            hour=("time", combined_ds.time.dt.hour.data)
-        )
-        
         years = combined_ds['year'].values
-        
-        # Find common days across all years
-        doys_per_year = []
-        for y in years:
-            ds_y = combined_ds.sel(year=int(y))
-            doys_in_year = np.unique(ds_y['time.dayofyear'].values)
-            doys_per_year.append(set(doys_in_year))
-        
-        common_doys = set.intersection(*doys_per_year)
-        common_doys = np.array(sorted(common_doys))
-        
-        # Aggregate to daily
-        daily_per_year = []
-        for y in years:
-            ds_y = combined_ds.sel(year=int(y))
-            daily = ds_y[self.parameters].groupby('time.dayofyear').mean(dim='time')
-            daily = daily.sel(dayofyear=common_doys)
-            daily_exp = daily.expand_dims({'year': [int(y)]})
-            daily_per_year.append(daily_exp)
-        
-        daily_ds = xr.concat(daily_per_year, dim='year')
-        daily_ds = daily_ds.assign_coords(year=('year', years))
-        
-        # Convert to numpy array
-        n_years = len(years)
-        n_days = len(common_doys)
-        n_vars = len(self.parameters)
-        X_raw = np.full((n_years, n_days, n_vars), np.nan, dtype=float)
-        
-        for vi, v in enumerate(self.parameters):
-            X_raw[:, :, vi] = daily_ds[v].values
-        
-        # Impute NaNs
-        for vi in range(n_vars):
-            var_data = X_raw[:, :, vi]
-            var_mean = np.nanmean(var_data)
-            X_raw[:, :, vi] = np.nan_to_num(var_data, nan=var_mean)
+        hour_doys = combined_ds.time.dt.dayofyear.values
+        
+        # Find common days across all years (every year shares the concatenated
+        # time axis, so this is just its set of days of year)
+        common_doys = np.unique(hour_doys)
+        
+        # Aggregate to daily: NaN-skipping mean of each year's hours per day of
+        # year, as groupby('time.dayofyear').mean() did, in one pass over the
+        # (year, time, variable) block
+        hourly = combined_ds[self.parameters].to_array().transpose(
+            'year', 'time', 'variable').values
+        valid = ~np.isnan(hourly)
+        
+        # Sum each run of consecutive same-day hours, then fold runs into doys
+        run_starts = np.flatnonzero(np.r_[True, hour_doys[1:] != hour_doys[:-1]])
+        run_sums = np.add.reduceat(np.where(valid, hourly, 0.0), run_starts, axis=1)
+        run_counts = np.add.reduceat(valid, run_starts, axis=1, dtype=np.intp)
+        
+        run_doy_idx = np.searchsorted(common_doys, hour_doys[run_starts])
+        n_years, n_vars = len(years), len(self.parameters)
+        day_sums = np.zeros((n_years, len(common_doys), n_vars))
+        day_counts = np.zeros((n_years, len(common_doys), n_vars), dtype=np.intp)
+        np.add.at(day_sums, (slice(None), run_doy_idx), run_sums)
+        np.add.at(day_counts, (slice(None), run_doy_idx), run_counts)
+        
+        with np.errstate(invalid='ignore'):
+            X_raw = day_sums / day_counts
+        
+        # Impute NaNs with each variable's mean over all years and days
+        var_means = np.nanmean(X_raw, axis=(0, 1))
+        np.copyto(X_raw, var_means, where=np.isnan(X_raw))
         
         return X_raw, common_doys, years
 
     def build_state_vectors(self, X_raw, days_window):
-        """Build state vectors from daily data"""
+        """Build state vectors from daily data, one row per (year, valid day)"""
         n_years, n_days, n_vars = X_raw.shape
         n_valid_days = n_days - 2 * days_window
         state_dim = (2 * days_window + 1) * n_vars
-        X_state = np.zeros((n_years, n_valid_days, state_dim))
         
-        for y_idx in range(n_years):
-            for d_idx in range(days_window, n_days - days_window):
-                window_slice = X_raw[y_idx, d_idx - days_window : d_idx + days_window + 1, :]
-                X_state[y_idx, d_idx - days_window, :] = window_slice.flatten()
+        # (n_years, n_valid_days, n_vars, W) strided view of every window,
+        # reordered to day-major so each state vector is window_slice.flatten();
+        # with days_window > 0, reshaping the strided view to 2-D is the only copy
+        windows = np.lib.stride_tricks.sliding_window_view(
+            X_raw, window_shape=2 * days_window + 1, axis=1)
+        windows = np.moveaxis(windows, -1, -2)
+        X_state = windows.reshape(n_years * n_valid_days, state_dim)
         
         return X_state
 
     def compute_weights(self, years, target_year, doys, target_doy, 
                        alpha_year=0.5, alpha_day=0.2):
         """Compute temporal and seasonal weights"""
-        dist_year = np.abs(np.array(years) - target_year)
-        W_year = np.exp(-alpha_year * dist_year)
+        dist_year = np.abs(np.asarray(years) - target_year)
+        W_year = _decay_weights(alpha_year, dist_year, 64)
         W_year = W_year / W_year.sum()
         
-        dist_day = np.abs(np.array(doys) - target_doy)
-        W_day = np.exp(-alpha_day * dist_day)
+        # Day-of-year distances never exceed 365
+        dist_day = np.abs(np.asarray(doys) - target_doy)
+        W_day = _decay_weights(alpha_day, dist_day, 367)
         W_day = W_day / W_day.sum()
         
         W_combined = np.outer(W_year, W_day)
@@ -153,20 +270,20 @@ class WeatherPredictor:
         w = weights / weights.sum()
         mu = np.average(X, axis=0, weights=w)
         Xc = X - mu
-        Xc_w = Xc * w[:, None]
-        Sigma = Xc.T @ Xc_w
-        Sigma = 0.5 * (Sigma + Sigma.T)
         
-        eigvals, eigvecs = np.linalg.eigh(Sigma)
-        idx = np.argsort(eigvals)[::-1]
-        eigvals = eigvals[idx]
-        eigvecs = eigvecs[:, idx]
+        # SVD of the sqrt-weighted data instead of eigh on Sigma = B.T @ B:
+        # no covariance to form, and singular values come out sorted descending
+        B = Xc * np.sqrt(w)[:, None]
+        _, s, Vt = scipy.linalg.svd(B, full_matrices=False,
+                                    lapack_driver='gesdd', check_finite=False)
+        eigvals = s ** 2
+        eigvecs = Vt.T
         
         total_var = np.sum(eigvals)
         explained_ratio = eigvals / (total_var + 1e-16)
         cumvar = np.cumsum(explained_ratio)
         k = int(np.searchsorted(cumvar, var_threshold) + 1)
-        k = max(1, min(k, n_features))
+        k = max(1, min(k, len(eigvals)))
         
         eigvals_k = eigvals[:k]
         eigvecs_k = eigvecs[:, :k]
@@ -180,17 +297,20 @@ class WeatherPredictor:
         """Generate Monte Carlo ensemble"""
         n_components = len(eigvals_k)
         pc_std = np.sqrt(eigvals_k)
-        pc_samples = np.random.normal(
-            loc=0.0, scale=pc_std[None, :], size=(N_mc, n_components))
-        
-        X_centered_samples = pc_samples @ eigvecs_k.T
-        X_samples = X_centered_samples + mu[None, :]
-        
-        # Extract center day
+        # PCG64 draws in float32, scaled in place; the projection below then
+        # stays in single precision
+        pc_samples = self.rng.standard_normal(
+            size=(N_mc, n_components), dtype=np.float32)
+        pc_samples *= pc_std
+        
+        # Only the center day is used, so project onto its rows of the basis
+        # rather than the whole state vector
         center_slot = days_window
         start_idx = center_slot * n_vars
         end_idx = start_idx + n_vars
-        center_samples = X_samples[:, start_idx:end_idx]
+        center_basis = eigvecs_k[start_idx:end_idx, :].astype(np.float32)
+        center_samples = pc_samples @ center_basis.T
+        center_samples += mu[start_idx:end_idx].astype(np.float32)
         
         # Apply physical constraints
         self.apply_constraints(center_samples)
@@ -199,21 +319,7 @@ class WeatherPredictor:
 
     def apply_constraints(self, samples):
         """Apply physical bounds to predictions"""
-        clip_dict = {
-            0: (0.0, None),      # PRECTOTCORR
-            1: (-80.0, 60.0),    # T2M
-            2: (0.0, 100.0),     # RH2M
-            3: (0.0, 100.0),     # CLOUD_AMT
-            4: (0.0, None),      # WS10M
-            5: (0.0, None),      # ALLSKY_SFC_SW_DWN
-            6: (-80.0, 60.0)     # T2MDEW
-        }
-        
-        for vi, (lo, hi) in clip_dict.items():
-            if lo is not None:
-                samples[:, vi] = np.maximum(samples[:, vi], lo)
-            if hi is not None:
-                samples[:, vi] = np.minimum(samples[:, vi], hi)
+        np.clip(samples, self._lo, self._hi, out=samples)
 
     def predict(self, lat, lon, target_date, years_back=15, days_window=2, 
                 N_mc=1000, random_seed=42,include_current_year=False):
@@ -232,7 +338,7 @@ class WeatherPredictor:
         Returns:
             dict: Prediction results with statistics
         """
-        np.random.seed(random_seed)
+        self.rng = np.random.default_rng(random_seed)
         
         target_month = target_date.month
         target_day = target_date.day
@@ -256,7 +362,7 @@ class WeatherPredictor:
         X_raw, common_doys, years = self.prepare_daily_data(combined_ds, days_window)
         
         # Build state vectors
-        X_state = self.build_state_vectors(X_raw, days_window)
+        X_all = self.build_state_vectors(X_raw, days_window)
         valid_doys = common_doys[days_window : -days_window]
         
         # Compute weights
@@ -264,7 +370,6 @@ class WeatherPredictor:
             years, target_year, valid_doys, target_doy)
         
         # Weighted PCA
-        X_all = X_state.reshape(-1, X_state.shape[2])
         w_all = W_combined.ravel()
         eigvals_k, eigvecs_k, mu, n_components = self.weighted_pca(X_all, w_all)
         
@@ -297,14 +402,21 @@ class WeatherPredictor:
             'T2MDEW': 'dew_point'
         }
         
+        # Column-wise statistics for all variables at once; the three
+        # quantiles share one partition per column. Accumulate in float64:
+        # strided float32 column sums lose precision at large N_mc
+        means = center_samples.mean(axis=0, dtype=np.float64)
+        stds = center_samples.std(axis=0, dtype=np.float64)
+        p5, p50, p95 = np.quantile(center_samples, [0.05, 0.5, 0.95], axis=0)
+        
         for vi, var_name in enumerate(self.parameters):
             readable_name = var_mapping.get(var_name, var_name)
             results['predictions'][readable_name] = {
-                'mean': float(np.mean(center_samples[:, vi])),
-                'median': float(np.median(center_samples[:, vi])),
-                'std': float(np.std(center_samples[:, vi])),
-                'p5': float(np.percentile(center_samples[:, vi], 5)),
-                'p95': float(np.percentile(center_samples[:, vi], 95)),
+                'mean': float(means[vi]),
+                'median': float(p50[vi]),
+                'std': float(stds[vi]),
+                'p5': float(p5[vi]),
+                'p95': float(p95[vi]),
                 'unit': self.get_unit(var_name)
             }
         
@@ -329,6 +441,21 @@ class WeatherPredictor:
         return units.get(var_name, '')
 
 
+@lru_cache(maxsize=8)
+def _decay_table(alpha, size):
+    """exp(-alpha * d) for every integer distance d in [0, size)"""
+    table = np.exp(-alpha * np.arange(size))
+    table.setflags(write=False)
+    return table
+
+
+def _decay_weights(alpha, dist, table_size):
+    """exp(-alpha * dist), gathered from a cached table for integer distances"""
+    if np.issubdtype(dist.dtype, np.integer) and dist.max() < table_size:
+        return _decay_table(alpha, table_size)[dist]
+    return np.exp(-alpha * dist)
+
+
 # Convenience function for easy integration
 def predict_weather(lat, lon, target_date, years_back=15, N_mc=1000):
     """
@@ -352,6 +479,8 @@ def predict_weather(lat, lon, target_date, years_back=15, N_mc=1000):
 
 
 if __name__ == "__main__":
+    warnings.filterwarnings('ignore')
+    
     # Test the predictor
     results = predict_weather(
         lat=50.0,